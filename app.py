@@ -1,19 +1,55 @@
+import hashlib
+import logging
 import os
+import queue
+import re
 import time
 import threading
-from datetime import datetime
+from dataclasses import dataclass
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+import orjson
 import requests
-import yfinance as yf
-from flask import Flask, request, render_template_string, jsonify
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype,
+        )
+
 
 app = Flask(__name__)
+logger = logging.getLogger("borsa")
+app.json = OrjsonProvider(app)
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+app.config["COMPRESS_MIN_SIZE"] = 500
+Compress(app)
 
 # ================= ENV =================
 TOKEN = os.environ.get("TOKEN", "").strip()
 CHAT_ID = os.environ.get("CHAT_ID", "").strip()
+TELEGRAM_ENABLED = bool(TOKEN and CHAT_ID)
+TELEGRAM_SEND_URL = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+TELEGRAM_MAX_TEXT = 4096
+TELEGRAM_BATCH_WINDOW_SEC = 1.0
 RUN_MONITOR_IN_WEB = os.environ.get("RUN_MONITOR_IN_WEB", "false").strip().lower() == "true"
 STRATEGY_PRESET = os.environ.get("STRATEGY_PRESET", "DENGELI").strip().upper()
 
@@ -68,6 +104,7 @@ def _env_int(name: str, default: int) -> int:
 
 ACCOUNT_SIZE = _env_float("ACCOUNT_SIZE", 150000)
 RISK_PERCENT = _env_float("RISK_PERCENT", 2)
+RISK_AMOUNT = ACCOUNT_SIZE * (RISK_PERCENT / 100.0)
 BAND_SIZE_TL = _env_float("BAND_SIZE_TL", 1)
 MIN_STOP_DISTANCE_TL = _env_float("MIN_STOP_DISTANCE_TL", 0.5)
 MAX_STOP_DISTANCE_TL = _env_float("MAX_STOP_DISTANCE_TL", 20)
@@ -81,6 +118,10 @@ DECISION_NOTIFY_ACTIONS = {
 }
 
 ANALYSIS_REFRESH_SEC = _env_int("ANALYSIS_REFRESH_SEC", 300)
+PRICE_CACHE_TTL_SEC = _env_int("PRICE_CACHE_TTL_SEC", 20)
+HISTORY_CACHE_TTL_SEC = _env_int("HISTORY_CACHE_TTL_SEC", 900)
+FUNDAMENTAL_CACHE_TTL_SEC = _env_int("FUNDAMENTAL_CACHE_TTL_SEC", 21600)
+STATE_FILE = os.environ.get("STATE_FILE", "").strip()
 DECISION_ALERT_COOLDOWN_SEC = _env_int("DECISION_ALERT_COOLDOWN_SEC", int(_preset["DECISION_ALERT_COOLDOWN_SEC"]))
 NEWS_LOOKBACK_HOURS = _env_int("NEWS_LOOKBACK_HOURS", 72)
 
@@ -94,6 +135,7 @@ REGIME_WEIGHT = _env_float("REGIME_WEIGHT", _preset["REGIME_WEIGHT"])
 BACKTEST_INITIAL_CAPITAL = _env_float("BACKTEST_INITIAL_CAPITAL", 100000)
 DECISION_LOG_LIMIT = _env_int("DECISION_LOG_LIMIT", 200)
 DAILY_RISK_CAP_PERCENT = _env_float("DAILY_RISK_CAP_PERCENT", 6.0)
+DAILY_RISK_BUDGET = ACCOUNT_SIZE * (DAILY_RISK_CAP_PERCENT / 100.0)
 MAX_ACTIVE_POSITIONS = _env_int("MAX_ACTIVE_POSITIONS", 2)
 MAX_POSITIONS_PER_SECTOR = _env_int("MAX_POSITIONS_PER_SECTOR", 1)
 PARTIAL_TP1_RATIO = _env_float("PARTIAL_TP1_RATIO", 0.5)
@@ -104,6 +146,10 @@ WEEKLY_REPORT_WEEKDAY = _env_int("WEEKLY_REPORT_WEEKDAY", 4)
 WEEKLY_REPORT_HOUR = _env_int("WEEKLY_REPORT_HOUR", 17)
 ALLOW_DECISION_ALERTS_OUTSIDE_MARKET = os.environ.get("ALLOW_DECISION_ALERTS_OUTSIDE_MARKET", "false").strip().lower() == "true"
 STRICT_MARKET_HOURS = os.environ.get("STRICT_MARKET_HOURS", "true").strip().lower() == "true"
+ISTANBUL_TZ = ZoneInfo("Europe/Istanbul")
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+MARKET_OPEN_HOUR = 9
+MARKET_CLOSE_HOUR = 18
 
 EFFECTIVE_STRATEGY = {
     "preset": STRATEGY_PRESET,
@@ -174,18 +220,49 @@ WATCHLIST: Dict[str, Dict[str, Any]] = {
     },
 }
 
+WATCHLIST_SYMBOLS = frozenset(WATCHLIST)
+
 SECTOR_HINTS: Dict[str, str] = {
     "ASELS.IS": "INDUSTRIALS",
     "TUPRS.IS": "ENERGY",
     "FROTO.IS": "CONSUMER CYCLICAL",
 }
 
-_TICKERS: Dict[str, yf.Ticker] = {}
+_TICKERS: Dict[str, Any] = {}
+_http = requests.Session()
+_http.headers["User-Agent"] = "Mozilla/5.0 (compatible; borsa-telegram-bot)"
+_http.mount(
+    "https://api.telegram.org/",
+    HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=Retry(total=2, backoff_factor=0.2)),
+)
+# No retries for Yahoo: a 429 Retry-After would otherwise park a _fetch_pool thread while
+# _price_fetch_lock is held; a failed chart quote falls back to yfinance instead.
+_http.mount(
+    "https://query1.finance.yahoo.com/",
+    HTTPAdapter(pool_connections=1, pool_maxsize=8, max_retries=Retry(total=0, respect_retry_after_header=False)),
+)
+_fetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="yf-fetch")
+# Separate from _fetch_pool: build_decision submits its own lookups there and would deadlock a shared pool.
+_analysis_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="analysis")
+# A single sender keeps alerts in the order the monitor produced them; the bound
+# drops new alerts instead of piling them up while Telegram is unreachable.
+_telegram_queue: "queue.Queue[str]" = queue.Queue(maxsize=64)
+_telegram_sender_started = False
+_telegram_sender_lock = threading.Lock()
 _state_lock = threading.Lock()
 _monitor_started = False
 _monitor_lock = threading.Lock()
+_monitor_wake = threading.Event()
 _regime_cache: Dict[str, Any] = {"score": 55.0, "reason": "Nötr", "updated_at": 0.0}
 _symbol_sector_cache: Dict[str, str] = {}
+_last_prices: Dict[str, Tuple[float, float]] = {}
+_price_fetch_lock = threading.Lock()
+_history_cache: Dict[str, Tuple[Any, float]] = {}
+_fundamental_cache: Dict[str, Tuple[Dict[str, Any], float]] = {}
+_market_open_cache: Dict[str, Any] = {"valid_until": 0.0, "value": False}
+_today_cache: Dict[str, Any] = {"valid_until": 0.0, "value": ""}
+# (built_at, json_body, etag); rebound as a whole so readers never see a half-built snapshot.
+_payload_snapshot: Tuple[float, Optional[bytes], str] = (0.0, None, "")
 _risk_state: Dict[str, Any] = {
     "date": "",
     "daily_used_risk": 0.0,
@@ -234,48 +311,226 @@ def normalize_weights() -> Tuple[float, float, float, float]:
 
 
 def market_open() -> bool:
-    now = datetime.now(ZoneInfo("Europe/Istanbul"))
-    if now.weekday() >= 5:
-        return False
-    return 9 <= now.hour < 18
+    now_ts = time.time()
+    if now_ts < _market_open_cache["valid_until"]:
+        return _market_open_cache["value"]
+
+    # Session state only flips on the hour, so the answer holds until the next one.
+    now = datetime.fromtimestamp(now_ts, ISTANBUL_TZ)
+    value = now.weekday() < 5 and MARKET_OPEN_HOUR <= now.hour < MARKET_CLOSE_HOUR
+    elapsed_in_hour = now.minute * 60 + now.second + now.microsecond / 1e6
+    _market_open_cache["value"] = value
+    _market_open_cache["valid_until"] = now_ts + (3600.0 - elapsed_in_hour)
+    return value
+
+
+def seconds_to_next_open() -> float:
+    now = datetime.now(ISTANBUL_TZ)
+    nxt = now.replace(hour=MARKET_OPEN_HOUR, minute=0, second=0, microsecond=0)
+    if now >= nxt:
+        nxt += timedelta(days=1)
+    while nxt.weekday() >= 5:
+        nxt += timedelta(days=1)
+    return max(1.0, (nxt - now).total_seconds())
+
 
+def yf_module():
+    # yfinance pulls in pandas and friends; defer that cost until data is first needed.
+    import yfinance
 
-def get_ticker(symbol: str) -> yf.Ticker:
-    if symbol not in _TICKERS:
-        _TICKERS[symbol] = yf.Ticker(symbol)
-    return _TICKERS[symbol]
+    return yfinance
+
+
+def get_ticker(symbol: str):
+    ticker = _TICKERS.get(symbol)
+    if ticker is None:
+        ticker = _TICKERS.setdefault(symbol, yf_module().Ticker(symbol))
+    return ticker
+
+
+def _fetch_chart_last_price(symbol: str) -> Optional[float]:
+    try:
+        resp = _http.get(
+            YAHOO_CHART_URL.format(symbol=symbol),
+            params={"range": "1d", "interval": "1d"},
+            timeout=5,
+        )
+        resp.raise_for_status()
+        result = orjson.loads(resp.content)["chart"]["result"][0]
+    except requests.RequestException as exc:
+        logger.warning("chart quote for %s failed: %s", symbol, exc)
+        return None
+    except (ValueError, KeyError, IndexError, TypeError):
+        logger.warning("chart quote for %s returned an unexpected payload", symbol)
+        return None
+
+    market_price = (result.get("meta") or {}).get("regularMarketPrice")
+    if market_price is not None:
+        return float(market_price)
+    try:
+        closes = result["indicators"]["quote"][0]["close"]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return next((float(c) for c in reversed(closes or []) if c is not None), None)
 
 
 def fetch_last_price(symbol: str) -> Optional[float]:
+    price = _fetch_chart_last_price(symbol)
+    if price is not None:
+        return price
     try:
-        hist = get_ticker(symbol).history(period="1d", interval="1m", actions=False, timeout=5)
+        hist = get_ticker(symbol).history(period="1d", interval="1d", actions=False, timeout=5)
         if hist is None or hist.empty:
             return None
         return float(hist["Close"].iloc[-1])
-    except Exception:
+    except Exception as exc:
+        logger.warning("history quote for %s failed: %s", symbol, exc)
         return None
 
 
+def _download_last_prices(symbols: List[str]) -> Dict[str, float]:
+    try:
+        data = yf_module().download(
+            symbols,
+            period="1d",
+            # Today's daily bar carries the live close; minute bars would parse ~500 rows per symbol.
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            actions=False,
+            threads=True,
+            progress=False,
+            timeout=8,
+        )
+    except Exception as exc:
+        logger.warning("batched quote download failed: %s", exc)
+        return {}
+    if data is None or data.empty:
+        return {}
+
+    prices: Dict[str, float] = {}
+    for symbol in symbols:
+        try:
+            frame = data[symbol] if data.columns.nlevels > 1 else data
+            close = frame["Close"].dropna()
+            if not close.empty:
+                prices[symbol] = float(close.iloc[-1])
+        except Exception:
+            continue
+    return prices
+
+
+def fetch_last_prices(symbols: List[str]) -> Dict[str, Optional[float]]:
+    if not symbols:
+        return {}
+    prices: Dict[str, Optional[float]] = dict(_download_last_prices(symbols))
+    missing = [s for s in symbols if s not in prices]
+    if missing:
+        prices.update(zip(missing, _fetch_pool.map(fetch_last_price, missing)))
+
+    # Entries are immutable (price, ts) tuples, so single-key writes and reads need no lock.
+    now_ts = time.time()
+    for symbol, price in prices.items():
+        if price is not None:
+            _last_prices[symbol] = (price, now_ts)
+    return prices
+
+
+def _cached_prices(symbols: List[str], max_age_sec: float) -> Dict[str, Optional[float]]:
+    now_ts = time.time()
+    prices: Dict[str, Optional[float]] = {}
+    for symbol in symbols:
+        cached = _last_prices.get(symbol)
+        if cached and now_ts - cached[1] <= max_age_sec:
+            prices[symbol] = cached[0]
+    return prices
+
+
+def latest_prices(symbols: List[str], max_age_sec: float = PRICE_CACHE_TTL_SEC) -> Dict[str, Optional[float]]:
+    prices = _cached_prices(symbols, max_age_sec)
+    stale = [s for s in symbols if s not in prices]
+    if not stale:
+        return prices
+    # One upstream fetch at a time: callers queued behind it usually find their symbols fresh.
+    with _price_fetch_lock:
+        prices.update(_cached_prices(stale, max_age_sec))
+        stale = [s for s in stale if s not in prices]
+        if stale:
+            prices.update(fetch_last_prices(stale))
+    return prices
+
+
 def fetch_daily_history(symbol: str):
+    cached = _history_cache.get(symbol)
+    if cached and time.time() - cached[1] < HISTORY_CACHE_TTL_SEC:
+        return cached[0]
     try:
         hist = get_ticker(symbol).history(period="2y", interval="1d", actions=False, timeout=8)
         if hist is None or hist.empty:
             return None
-        return hist.dropna(subset=["Close", "High", "Low"])
-    except Exception:
+        hist = hist.dropna(subset=["Close", "High", "Low"])
+    except Exception as exc:
+        logger.warning("daily history for %s failed: %s", symbol, exc)
         return None
+    _history_cache[symbol] = (hist, time.time())
+    return hist
+
+
+def prefetch_daily_histories(symbols: List[str]) -> None:
+    now_ts = time.time()
+    stale = [s for s in symbols if now_ts - _history_cache.get(s, (None, 0.0))[1] >= HISTORY_CACHE_TTL_SEC]
+    if len(stale) < 2:
+        return
+    try:
+        data = yf_module().download(
+            stale,
+            period="2y",
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=True,
+            actions=False,
+            threads=True,
+            progress=False,
+            timeout=8,
+        )
+    except Exception as exc:
+        logger.warning("batched daily history download failed: %s", exc)
+        return
+    if data is None or data.empty:
+        return
+
+    for symbol in stale:
+        try:
+            hist = data[symbol].dropna(subset=["Close", "High", "Low"])
+        except Exception:
+            continue
+        if not hist.empty:
+            _history_cache[symbol] = (hist, now_ts)
+
+
+@lru_cache(maxsize=32)
+def _ewm_weights(n: int, alpha: float) -> np.ndarray:
+    # Unrolled adjust=False recurrence: the first value keeps (1-a)^(n-1), bar i gets a*(1-a)^(n-1-i).
+    weights = alpha * (1.0 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1.0 - alpha) ** (n - 1)
+    weights.setflags(write=False)
+    return weights
+
+
+def ewm_last(values: np.ndarray, alpha: float) -> float:
+    return float(_ewm_weights(len(values), alpha) @ values)
+
+
+def ema_last(values: np.ndarray, span: int) -> float:
+    return ewm_last(values, 2.0 / (span + 1))
 
 
 def calculate_rsi(close_series, period: int = 14) -> Optional[float]:
     if close_series is None or len(close_series) < period + 2:
         return None
-    delta = close_series.diff()
-    up = delta.clip(lower=0)
-    down = (-delta).clip(lower=0)
-    avg_gain = up.ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
-    avg_loss = down.ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
-    last_gain = avg_gain.iloc[-1]
-    last_loss = avg_loss.iloc[-1]
+    delta = np.diff(np.asarray(close_series, dtype=np.float64))
+    last_gain = ewm_last(np.maximum(delta, 0.0), 1 / period)
+    last_loss = ewm_last(np.maximum(-delta, 0.0), 1 / period)
     if last_loss == 0:
         return 100.0
     rs = last_gain / last_loss
@@ -288,26 +543,86 @@ def stop_distance_allowed(entry: float, stop: float) -> bool:
 
 
 def calculate_position(entry: float, stop: float) -> Tuple[int, float]:
-    risk_amount = ACCOUNT_SIZE * (RISK_PERCENT / 100.0)
     per_share_risk = abs(entry - stop)
     if per_share_risk <= 0:
         return 0, 0.0
-    lot = int(risk_amount / per_share_risk)
+    lot = int(RISK_AMOUNT / per_share_risk)
     total_risk = lot * per_share_risk
     return lot, total_risk
 
 
-def send_telegram(message: str) -> None:
-    if not TOKEN or not CHAT_ID:
-        return
+def _post_telegram(message: str, retry_on_limit: bool = True) -> None:
     try:
-        requests.post(
-            f"https://api.telegram.org/bot{TOKEN}/sendMessage",
+        resp = _http.post(
+            TELEGRAM_SEND_URL,
             json={"chat_id": CHAT_ID, "text": message},
             timeout=5,
         )
-    except Exception:
-        pass
+    except requests.RequestException as exc:
+        logger.warning("telegram send failed: %s", exc)
+        return
+    if resp.status_code == 429 and retry_on_limit:
+        try:
+            retry_after = float(resp.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            retry_after = 1.0
+        time.sleep(min(max(retry_after, 0.0), 60.0))
+        _post_telegram(message, retry_on_limit=False)
+        return
+    if not resp.ok:
+        logger.warning("telegram send rejected: HTTP %s %s", resp.status_code, resp.text[:200])
+
+
+def _pack_telegram_messages(messages: List[str]) -> List[str]:
+    packed: List[str] = []
+    for message in messages:
+        if packed and len(packed[-1]) + 2 + len(message) <= TELEGRAM_MAX_TEXT:
+            packed[-1] = f"{packed[-1]}\n\n{message}"
+        else:
+            packed.append(message)
+    return packed
+
+
+def _telegram_sender() -> None:
+    while True:
+        # Alerts fired in the same tick go out as one message, keeping us under Telegram's rate limits.
+        batch = [_telegram_queue.get()]
+        deadline = time.monotonic() + TELEGRAM_BATCH_WINDOW_SEC
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_telegram_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        for text in _pack_telegram_messages(batch):
+            # This thread is the only consumer; an escaped exception would leave alerts queued forever.
+            try:
+                _post_telegram(text)
+            except Exception:
+                logger.exception("telegram sender failed")
+
+
+def _ensure_telegram_sender() -> None:
+    global _telegram_sender_started
+    if _telegram_sender_started:
+        return
+    with _telegram_sender_lock:
+        if _telegram_sender_started:
+            return
+        threading.Thread(target=_telegram_sender, name="telegram", daemon=True).start()
+        _telegram_sender_started = True
+
+
+def send_telegram(message: str) -> None:
+    if not TELEGRAM_ENABLED:
+        return
+    _ensure_telegram_sender()
+    try:
+        _telegram_queue.put_nowait(message)
+    except queue.Full:
+        logger.warning("telegram queue full, dropping message: %s", message[:80])
 
 
 def recenter_band(st: Dict[str, Any], center_price: float) -> Tuple[float, float]:
@@ -316,15 +631,91 @@ def recenter_band(st: Dict[str, Any], center_price: float) -> Tuple[float, float
     upper = round(center_price + half_band, 2)
     st["lower"] = lower
     st["upper"] = upper
+    mark_bands_dirty_locked()
     return lower, upper
 
 
+@dataclass(slots=True)
+class BandColumns:
+    symbols: List[str]
+    lowers: np.ndarray
+    uppers: np.ndarray
+    alerted: np.ndarray
+
+
+_ALERT_CODES = {"lower": 1, "upper": 2}
+_band_columns: Optional[BandColumns] = None
+
+
+_home_html: Optional[str] = None
+
+
+def mark_bands_dirty_locked() -> None:
+    global _band_columns, _home_html
+    _band_columns = None
+    _home_html = None
+
+
+def band_columns_locked() -> BandColumns:
+    global _band_columns
+    if _band_columns is None:
+        symbols = list(WATCHLIST.keys())
+        _band_columns = BandColumns(
+            symbols=symbols,
+            lowers=np.array([float(WATCHLIST[s]["lower"]) for s in symbols], dtype=np.float64),
+            uppers=np.array([float(WATCHLIST[s]["upper"]) for s in symbols], dtype=np.float64),
+            alerted=np.array([_ALERT_CODES.get(WATCHLIST[s].get("alerted"), 0) for s in symbols], dtype=np.int8),
+        )
+    return _band_columns
+
+
+def band_hits_locked(prices: Dict[str, Optional[float]]) -> Dict[str, str]:
+    cols = band_columns_locked()
+    if not cols.symbols:
+        return {}
+
+    price_arr = np.array([prices.get(s) for s in cols.symbols], dtype=np.float64)
+    codes = np.select(
+        [
+            (price_arr <= cols.lowers) & (cols.alerted != 1),
+            (price_arr >= cols.uppers) & (cols.alerted != 2),
+            (price_arr > cols.lowers) & (price_arr < cols.uppers) & (cols.alerted != 0),
+        ],
+        ["lower", "upper", "inside"],
+        default="",
+    )
+    return {cols.symbols[i]: str(codes[i]) for i in np.flatnonzero(codes != "")}
+
+
+def band_hit_locked(st: Dict[str, Any], price: float) -> Optional[str]:
+    lower = float(st["lower"])
+    upper = float(st["upper"])
+    alerted = _ALERT_CODES.get(st.get("alerted"), 0)
+    if price <= lower and alerted != 1:
+        return "lower"
+    if price >= upper and alerted != 2:
+        return "upper"
+    if lower < price < upper and alerted != 0:
+        return "inside"
+    return None
+
+
+def band_signals(cols: BandColumns, prices: Dict[str, Optional[float]]) -> Dict[str, str]:
+    price_arr = np.array([prices.get(s) for s in cols.symbols], dtype=np.float64)
+    labels = np.select(
+        [np.isnan(price_arr), price_arr <= cols.lowers, price_arr >= cols.uppers],
+        ["VERI YOK", "AL", "SAT"],
+        default="BEKLE",
+    )
+    return dict(zip(cols.symbols, labels.tolist()))
+
+
 def append_decision_log(st: Dict[str, Any], symbol: str, decision: Dict[str, Any], price: float, ts: float) -> None:
     logs = st.setdefault("decision_log", [])
     logs.append(
         {
             "ts": ts,
-            "time": datetime.fromtimestamp(ts, ZoneInfo("Europe/Istanbul")).strftime("%Y-%m-%d %H:%M:%S"),
+            "time": datetime.fromtimestamp(ts, ISTANBUL_TZ).strftime("%Y-%m-%d %H:%M:%S"),
             "symbol": symbol,
             "price": safe_round(price),
             "action": decision.get("action"),
@@ -343,7 +734,15 @@ def append_decision_log(st: Dict[str, Any], symbol: str, decision: Dict[str, Any
 
 
 def _today_istanbul_date() -> str:
-    return datetime.now(ZoneInfo("Europe/Istanbul")).strftime("%Y-%m-%d")
+    now_ts = time.time()
+    if now_ts < _today_cache["valid_until"]:
+        return _today_cache["value"]
+
+    now = datetime.fromtimestamp(now_ts, ISTANBUL_TZ)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    _today_cache["value"] = now.strftime("%Y-%m-%d")
+    _today_cache["valid_until"] = midnight.timestamp()
+    return _today_cache["value"]
 
 
 def _ensure_risk_day_locked() -> None:
@@ -437,7 +836,7 @@ def _sector_position_count_locked(sector: str) -> int:
 def apply_risk_controls_locked(symbol: str, decision: Dict[str, Any], now_ts: float) -> Dict[str, Any]:
     _ensure_risk_day_locked()
 
-    risk_budget = ACCOUNT_SIZE * (DAILY_RISK_CAP_PERCENT / 100.0)
+    risk_budget = DAILY_RISK_BUDGET
     open_positions = _risk_state.get("open_positions", {})
     sector = _get_symbol_sector(symbol)
 
@@ -653,13 +1052,15 @@ def evaluate_technical(symbol: str, current_price: float) -> Optional[Dict[str,
     if hist is None or len(hist) < 205:
         return None
 
-    close = hist["Close"]
-    ema20 = float(close.ewm(span=20, adjust=False).mean().iloc[-1])
-    ema50 = float(close.ewm(span=50, adjust=False).mean().iloc[-1])
-    ema200 = float(close.ewm(span=200, adjust=False).mean().iloc[-1])
-    rsi14 = calculate_rsi(close, 14)
-    atr20 = float((hist["High"] - hist["Low"]).rolling(20).mean().iloc[-1])
-    breakout_level = float(hist["High"].tail(21).head(20).max())
+    closes = hist["Close"].to_numpy(dtype=np.float64)
+    high = hist["High"].to_numpy(dtype=np.float64)
+    low = hist["Low"].to_numpy(dtype=np.float64)
+    ema20 = ema_last(closes, 20)
+    ema50 = ema_last(closes, 50)
+    ema200 = ema_last(closes, 200)
+    rsi14 = calculate_rsi(closes, 14)
+    atr20 = float(np.mean(high[-20:] - low[-20:]))
+    breakout_level = float(high[-21:-1].max())
 
     score = 0
     reasons: List[str] = []
@@ -721,9 +1122,14 @@ def evaluate_technical(symbol: str, current_price: float) -> Optional[Dict[str,
 
 
 def evaluate_fundamental(symbol: str) -> Dict[str, Any]:
+    cached = _fundamental_cache.get(symbol)
+    if cached and time.time() - cached[1] < FUNDAMENTAL_CACHE_TTL_SEC:
+        return cached[0]
+
     info = {}
     try:
-        info = get_ticker(symbol).info or {}
+        # A fresh Ticker, since yfinance keeps .info on the object for its lifetime.
+        info = yf_module().Ticker(symbol).info or {}
     except Exception:
         info = {}
 
@@ -795,7 +1201,7 @@ def evaluate_fundamental(symbol: str) -> Dict[str, Any]:
             score -= 6
             reasons.append("Marj zayif")
 
-    return {
+    result = {
         "score": int(clamp(score, 0, 100)),
         "reasons": reasons[:5],
         "pe": safe_round(pe),
@@ -803,6 +1209,9 @@ def evaluate_fundamental(symbol: str) -> Dict[str, Any]:
         "roe": safe_round(roe),
         "debt_to_equity": safe_round(debt_to_equity),
     }
+    if info:
+        _fundamental_cache[symbol] = (result, time.time())
+    return result
 
 
 def evaluate_news(symbol: str) -> Dict[str, Any]:
@@ -869,14 +1278,16 @@ def evaluate_market_regime() -> Dict[str, Any]:
     symbols = ["XU100.IS", "^XU100", "XU030.IS"]
     for regime_symbol in symbols:
         try:
-            hist = yf.Ticker(regime_symbol).history(period="1y", interval="1d", actions=False, timeout=8)
+            hist = get_ticker(regime_symbol).history(period="1y", interval="1d", actions=False, timeout=8)
             if hist is None or hist.empty or len(hist) < 60:
                 continue
 
-            close = hist["Close"]
-            ema20 = float(close.ewm(span=20, adjust=False).mean().iloc[-1])
-            ema50 = float(close.ewm(span=50, adjust=False).mean().iloc[-1])
-            last_close = float(close.iloc[-1])
+            closes = hist["Close"].dropna().to_numpy(dtype=np.float64)
+            if len(closes) < 60:
+                continue
+            ema20 = ema_last(closes, 20)
+            ema50 = ema_last(closes, 50)
+            last_close = float(closes[-1])
 
             if last_close > ema20 > ema50:
                 score, reason = 80.0, "Piyasa rejimi pozitif"
@@ -903,7 +1314,7 @@ def evaluate_market_regime() -> Dict[str, Any]:
 
 def _regime_series_for_backtest(length: int):
     try:
-        idx = yf.Ticker("^XU100").history(period="2y", interval="1d", actions=False, timeout=8)
+        idx = get_ticker("^XU100").history(period="2y", interval="1d", actions=False, timeout=8)
         if idx is None or idx.empty or len(idx) < 80:
             return [55.0] * length
         idx_close = idx["Close"]
@@ -1012,17 +1423,17 @@ def _performance_snapshot_locked() -> Dict[str, Any]:
 
 def _maybe_send_daily_report_locked(now_ts: float) -> None:
     _ensure_risk_day_locked()
-    if not TOKEN or not CHAT_ID:
+    if not TELEGRAM_ENABLED:
         return
 
-    now = datetime.fromtimestamp(now_ts, ZoneInfo("Europe/Istanbul"))
+    now = datetime.fromtimestamp(now_ts, ISTANBUL_TZ)
     if now.hour != DAILY_REPORT_HOUR:
         return
     if _performance_state.get("reports_sent"):
         return
 
     perf = _performance_snapshot_locked()
-    risk_budget = ACCOUNT_SIZE * (DAILY_RISK_CAP_PERCENT / 100.0)
+    risk_budget = DAILY_RISK_BUDGET
     used = float(_risk_state.get("daily_used_risk", 0.0))
 
     msg = (
@@ -1041,10 +1452,10 @@ def _maybe_send_daily_report_locked(now_ts: float) -> None:
 
 def _maybe_send_weekly_report_locked(now_ts: float) -> None:
     _ensure_risk_day_locked()
-    if not TOKEN or not CHAT_ID:
+    if not TELEGRAM_ENABLED:
         return
 
-    now = datetime.fromtimestamp(now_ts, ZoneInfo("Europe/Istanbul"))
+    now = datetime.fromtimestamp(now_ts, ISTANBUL_TZ)
     if now.weekday() != int(clamp(WEEKLY_REPORT_WEEKDAY, 0, 6)):
         return
     if now.hour != WEEKLY_REPORT_HOUR:
@@ -1070,6 +1481,30 @@ def _maybe_send_weekly_report_locked(now_ts: float) -> None:
         del sent[: len(sent) - 16]
 
 
+def _backtest_columns(data) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    return tuple(data[col].to_numpy(dtype=np.float64) for col in ("Close", "High", "Low", "ema20", "atr20"))
+
+
+def _backtest_tech_scores(data) -> np.ndarray:
+    price = data["Close"].to_numpy(dtype=np.float64)
+    ema20 = data["ema20"].to_numpy(dtype=np.float64)
+    ema50 = data["ema50"].to_numpy(dtype=np.float64)
+    ema200 = data["ema200"].to_numpy(dtype=np.float64)
+    rsi14 = data["rsi14"].to_numpy(dtype=np.float64)
+    atr20 = data["atr20"].to_numpy(dtype=np.float64)
+    breakout = data["breakout"].to_numpy(dtype=np.float64)
+    safe_price = np.maximum(price, 1e-6)
+    vol_ratio = atr20 / safe_price
+
+    score = np.select([(ema20 > ema50) & (ema50 > ema200), (ema20 < ema50) & (ema50 < ema200)], [35, 5], default=18)
+    score += np.where(price > ema50, 10, 0)
+    score += np.where(np.abs(price - ema20) / safe_price <= 0.015, 15, 0)
+    score += np.where(price > breakout, 15, 0)
+    score += np.select([(rsi14 >= 48) & (rsi14 <= 62), (rsi14 >= 40) & (rsi14 <= 70)], [12, 6], default=0)
+    score += np.where((vol_ratio >= 0.008) & (vol_ratio <= 0.045), 10, 0)
+    return np.clip(score, 0, 100)
+
+
 def run_backtest(symbol: str, days: int, initial_capital: float) -> Dict[str, Any]:
     hist = fetch_daily_history(symbol)
     if hist is None or len(hist) < 260:
@@ -1106,35 +1541,14 @@ def run_backtest(symbol: str, days: int, initial_capital: float) -> Dict[str, An
 
     position = None
 
-    for i, (idx, row) in enumerate(data.iterrows()):
-        price = float(row["Close"])
-        ema20 = float(row["ema20"])
-        ema50 = float(row["ema50"])
-        ema200 = float(row["ema200"])
-        rsi14 = float(row["rsi14"])
-        atr20 = float(row["atr20"])
-        breakout = float(row["breakout"])
-
-        tech_score = 0
-        if ema20 > ema50 > ema200:
-            tech_score += 35
-        elif ema20 < ema50 < ema200:
-            tech_score += 5
-        else:
-            tech_score += 18
-        if price > ema50:
-            tech_score += 10
-        if abs(price - ema20) / max(price, 1e-6) <= 0.015:
-            tech_score += 15
-        if price > breakout:
-            tech_score += 15
-        if 48 <= rsi14 <= 62:
-            tech_score += 12
-        elif 40 <= rsi14 <= 70:
-            tech_score += 6
-        if 0.008 <= (atr20 / max(price, 1e-6)) <= 0.045:
-            tech_score += 10
-        tech_score = clamp(tech_score, 0, 100)
+    closes, highs, lows, ema20s, atr20s = _backtest_columns(data)
+    tech_scores = _backtest_tech_scores(data)
+
+    for i in range(len(data)):
+        price = float(closes[i])
+        ema20 = float(ema20s[i])
+        atr20 = float(atr20s[i])
+        tech_score = float(tech_scores[i])
 
         regime_score = float(regime_scores[i])
         total_score = (
@@ -1161,7 +1575,7 @@ def run_backtest(symbol: str, days: int, initial_capital: float) -> Dict[str, An
                 if lot > 0:
                     position = {
                         "entry_price": price,
-                        "entry_date": str(idx.date()),
+                        "entry_date": str(data.index[i].date()),
                         "stop": stop,
                         "target": price + (2 * risk_per_share),
                         "lot": lot,
@@ -1169,10 +1583,10 @@ def run_backtest(symbol: str, days: int, initial_capital: float) -> Dict[str, An
         elif position is not None:
             exit_reason = None
             exit_price = None
-            if float(row["Low"]) <= position["stop"]:
+            if float(lows[i]) <= position["stop"]:
                 exit_price = position["stop"]
                 exit_reason = "STOP"
-            elif float(row["High"]) >= position["target"]:
+            elif float(highs[i]) >= position["target"]:
                 exit_price = position["target"]
                 exit_reason = "TARGET"
             elif action == "SAT":
@@ -1186,7 +1600,7 @@ def run_backtest(symbol: str, days: int, initial_capital: float) -> Dict[str, An
                 trades.append(
                     {
                         "entry_date": position["entry_date"],
-                        "exit_date": str(idx.date()),
+                        "exit_date": str(data.index[i].date()),
                         "entry": safe_round(position["entry_price"]),
                         "exit": safe_round(exit_price),
                         "lot": position["lot"],
@@ -1274,35 +1688,14 @@ def _simulate_segment(data, regime_scores: List[float], params: Dict[str, Any],
     gross_loss_abs = 0.0
     position = None
 
-    for i, (_, row) in enumerate(data.iterrows()):
-        price = float(row["Close"])
-        ema20 = float(row["ema20"])
-        ema50 = float(row["ema50"])
-        ema200 = float(row["ema200"])
-        rsi14 = float(row["rsi14"])
-        atr20 = float(row["atr20"])
-        breakout = float(row["breakout"])
-
-        tech_score = 0
-        if ema20 > ema50 > ema200:
-            tech_score += 35
-        elif ema20 < ema50 < ema200:
-            tech_score += 5
-        else:
-            tech_score += 18
-        if price > ema50:
-            tech_score += 10
-        if abs(price - ema20) / max(price, 1e-6) <= 0.015:
-            tech_score += 15
-        if price > breakout:
-            tech_score += 15
-        if 48 <= rsi14 <= 62:
-            tech_score += 12
-        elif 40 <= rsi14 <= 70:
-            tech_score += 6
-        if 0.008 <= (atr20 / max(price, 1e-6)) <= 0.045:
-            tech_score += 10
-        tech_score = clamp(tech_score, 0, 100)
+    closes, highs, lows, ema20s, atr20s = _backtest_columns(data)
+    tech_scores = _backtest_tech_scores(data)
+
+    for i in range(len(data)):
+        price = float(closes[i])
+        ema20 = float(ema20s[i])
+        atr20 = float(atr20s[i])
+        tech_score = float(tech_scores[i])
 
         regime_score = float(regime_scores[i]) if i < len(regime_scores) else 55.0
         total_score = tech_score * w_tech + 50.0 * w_fund + 50.0 * w_news + regime_score * w_regime
@@ -1329,9 +1722,9 @@ def _simulate_segment(data, regime_scores: List[float], params: Dict[str, Any],
                     }
         elif position is not None:
             exit_price = None
-            if float(row["Low"]) <= position["stop"]:
+            if float(lows[i]) <= position["stop"]:
                 exit_price = position["stop"]
-            elif float(row["High"]) >= position["target"]:
+            elif float(highs[i]) >= position["target"]:
                 exit_price = position["target"]
             elif action == "SAT":
                 exit_price = price
@@ -1489,9 +1882,11 @@ def build_decision(symbol: str, current_price: float) -> Optional[Dict[str, Any]
     if technical is None:
         return None
 
-    fundamental = evaluate_fundamental(symbol)
-    news = evaluate_news(symbol)
+    fundamental_future = _fetch_pool.submit(evaluate_fundamental, symbol)
+    news_future = _fetch_pool.submit(evaluate_news, symbol)
     regime = evaluate_market_regime()
+    fundamental = fundamental_future.result()
+    news = news_future.result()
 
     params = _runtime_params(float(regime.get("score") or 55.0))
     weights = params["weights"]
@@ -1627,20 +2022,98 @@ def format_decision_message(decision: Dict[str, Any]) -> str:
 
 
 # ================= MONITOR =================
+_PERSISTED_FIELDS = ("lower", "upper", "alerted", "initialized", "last_alert_at", "last_decision_alert_at", "decision")
+_saved_state: Optional[bytes] = None
+
+
+def load_watchlist_state() -> None:
+    global _saved_state
+    if not STATE_FILE:
+        return
+    try:
+        with open(STATE_FILE, "rb") as fh:
+            raw = fh.read()
+        saved = orjson.loads(raw)
+    except FileNotFoundError:
+        # First start with persistence enabled: nothing saved yet.
+        return
+    except (OSError, orjson.JSONDecodeError) as exc:
+        logger.warning("could not load STATE_FILE %s: %s", STATE_FILE, exc)
+        return
+    if not isinstance(saved, dict):
+        logger.warning("ignoring STATE_FILE %s: expected a JSON object", STATE_FILE)
+        return
+
+    with _state_lock:
+        for symbol, fields in saved.items():
+            st = WATCHLIST.get(symbol)
+            if st is None or not isinstance(fields, dict):
+                continue
+            st.update({k: fields[k] for k in _PERSISTED_FIELDS if k in fields})
+        mark_bands_dirty_locked()
+    _saved_state = raw
+
+
+def save_watchlist_state() -> None:
+    global _saved_state
+    if not STATE_FILE:
+        return
+    with _state_lock:
+        state = {s: {k: st.get(k) for k in _PERSISTED_FIELDS} for s, st in WATCHLIST.items()}
+    body = orjson.dumps(state, default=app.json.default, option=OrjsonProvider.option)
+    # Most ticks change nothing persisted; skip the write unless the bytes differ.
+    if body == _saved_state:
+        return
+    tmp_path = f"{STATE_FILE}.tmp"
+    try:
+        with open(tmp_path, "wb") as fh:
+            fh.write(body)
+        os.replace(tmp_path, STATE_FILE)
+    except OSError as exc:
+        logger.warning("could not save STATE_FILE %s: %s", STATE_FILE, exc)
+        return
+    _saved_state = body
+
+
+def wait_for_monitor_wake(timeout: float) -> None:
+    _monitor_wake.wait(timeout)
+    _monitor_wake.clear()
+
+
 def price_monitor_loop():
+    load_watchlist_state()
+    failures = 0
     while True:
         try:
             is_market_open = market_open()
 
             if STRICT_MARKET_HOURS and not is_market_open:
-                time.sleep(60)
+                wait_for_monitor_wake(min(3600.0, seconds_to_next_open()))
                 continue
 
+            tick_started = time.monotonic()
             with _state_lock:
                 symbols = list(WATCHLIST.keys())
 
+            fetched_prices = latest_prices(symbols)
+            with _state_lock:
+                band_hits = band_hits_locked(fetched_prices)
+                screened_columns = _band_columns
+                analysis_due = [
+                    s for s in symbols
+                    if s in WATCHLIST and time.time() - float(WATCHLIST[s].get("last_analysis_at", 0.0)) >= ANALYSIS_REFRESH_SEC
+                ]
+            prefetch_daily_histories(analysis_due)
+            if analysis_due:
+                evaluate_market_regime()
+            decision_futures = {
+                s: _analysis_pool.submit(build_decision, s, fetched_prices[s])
+                for s in analysis_due
+                if fetched_prices.get(s) is not None
+            }
+
             for symbol in symbols:
-                price = fetch_last_price(symbol)
+                price = fetched_prices.get(symbol)
                 if price is None:
                     continue
 
@@ -1660,19 +2133,24 @@ def price_monitor_loop():
                     st.setdefault("last_analysis_at", 0.0)
                     st.setdefault("last_decision_alert_at", 0.0)
 
+                    if _band_columns is screened_columns:
+                        band_hit = band_hits.get(symbol)
+                    else:
+                        # Limits changed after the screen (panel edit or an earlier recenter); re-check against st.
+                        band_hit = band_hit_locked(st, price)
                     if not st.get("initialized", False):
                         recenter_band(st, price)
                         st["alerted"] = None
                         st["initialized"] = True
+                        band_hit = None
 
                     if now_ts - float(st.get("last_analysis_at", 0.0)) >= ANALYSIS_REFRESH_SEC:
                         should_refresh_analysis = True
 
                     lower = float(st["lower"])
                     upper = float(st["upper"])
-                    alerted = st.get("alerted")
 
-                    if is_market_open and price <= lower and alerted != "lower":
+                    if is_market_open and band_hit == "lower":
                         stop = upper
                         new_lower, new_upper = recenter_band(st, price)
                         st["alerted"] = "lower"
@@ -1689,7 +2167,7 @@ def price_monitor_loop():
                             )
                             st["last_alert_at"] = now_ts
 
-                    elif is_market_open and price >= upper and alerted != "upper":
+                    elif is_market_open and band_hit == "upper":
                         stop = lower
                         new_lower, new_upper = recenter_band(st, price)
                         st["alerted"] = "upper"
@@ -1706,8 +2184,9 @@ def price_monitor_loop():
                             )
                             st["last_alert_at"] = now_ts
 
-                    elif is_market_open and lower < price < upper:
+                    elif is_market_open and band_hit == "inside":
                         st["alerted"] = None
+                        mark_bands_dirty_locked()
 
                 for ev in position_events:
                     with _state_lock:
@@ -1716,7 +2195,8 @@ def price_monitor_loop():
                         send_telegram(format_position_event_message(ev))
 
                 if should_refresh_analysis:
-                    decision = build_decision(symbol, price)
+                    future = decision_futures.get(symbol)
+                    decision = future.result() if future else build_decision(symbol, price)
                     if decision is None:
                         continue
 
@@ -1754,10 +2234,24 @@ def price_monitor_loop():
                 _maybe_send_daily_report_locked(time.time())
                 _maybe_send_weekly_report_locked(time.time())
 
-            time.sleep(30 if is_market_open else 60)
+            save_watchlist_state()
+            publish_data_payload()
+
+            failures = 0
+            if is_market_open:
+                period = 30.0
+            else:
+                # Prices are frozen off-session; only analysis and reports still need ticks.
+                # Staying under 30 min keeps at least one tick inside every report hour.
+                period = min(max(60.0, float(ANALYSIS_REFRESH_SEC)), 1800.0)
+            # Measure the period from the tick's start so slow fetches do not stretch the cadence.
+            wait_for_monitor_wake(max(0.0, period - (time.monotonic() - tick_started)))
 
         except Exception:
-            time.sleep(10)
+            failures += 1
+            logger.exception("monitor tick failed (%d in a row)", failures)
+            # Back off harder when failures persist, e.g. while Yahoo is rate-limiting us.
+            time.sleep(120 if failures >= 3 else 10)
 
 
 def ensure_monitor_started():
@@ -1776,48 +2270,61 @@ if RUN_MONITOR_IN_WEB:
 
 
 # ================= API =================
-@app.route("/api/data", methods=["GET"])
-def api_data():
+def build_data_payload() -> Dict[str, Any]:
     with _state_lock:
         snapshot = {k: v.copy() for k, v in WATCHLIST.items()}
         _ensure_risk_day_locked()
         risk_state = {
             "date": _risk_state.get("date"),
             "daily_used_risk": safe_round(_risk_state.get("daily_used_risk", 0.0)),
-            "daily_risk_budget": safe_round(ACCOUNT_SIZE * (DAILY_RISK_CAP_PERCENT / 100.0)),
+            "daily_risk_budget": safe_round(DAILY_RISK_BUDGET),
             "active_positions": len(_risk_state.get("open_positions", {})),
             "open_positions": _risk_state.get("open_positions", {}).copy(),
         }
         performance = _performance_snapshot_locked()
+        cols = band_columns_locked()
 
-    prices = {}
-    band_signals = {}
-    decisions = {}
+    live_prices = latest_prices(cols.symbols)
 
-    for s, d in snapshot.items():
-        p = fetch_last_price(s)
-        prices[s] = safe_round(p)
-
-        if p is None:
-            band_signals[s] = "VERI YOK"
-        elif p <= float(d["lower"]):
-            band_signals[s] = "AL"
-        elif p >= float(d["upper"]):
-            band_signals[s] = "SAT"
-        else:
-            band_signals[s] = "BEKLE"
-
-        decisions[s] = d.get("decision")
-
-    return jsonify({
-        "prices": prices,
+    return {
+        "prices": {s: safe_round(live_prices.get(s)) for s in cols.symbols},
         "watchlist": snapshot,
-        "band_signals": band_signals,
-        "decisions": decisions,
+        "band_signals": band_signals(cols, live_prices),
+        "decisions": {s: d.get("decision") for s, d in snapshot.items()},
         "strategy": EFFECTIVE_STRATEGY,
         "risk_state": risk_state,
         "performance": performance,
-    })
+    }
+
+
+def publish_data_payload() -> Tuple[bytes, str]:
+    global _payload_snapshot
+    body = orjson.dumps(build_data_payload(), default=app.json.default, option=OrjsonProvider.option)
+    etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+    _payload_snapshot = (time.time(), body, etag)
+    return body, etag
+
+
+def invalidate_data_payload() -> None:
+    global _payload_snapshot
+    _payload_snapshot = (0.0, None, "")
+
+
+def current_data_body() -> Tuple[bytes, str]:
+    built_at, body, etag = _payload_snapshot
+    if body is not None and time.time() - built_at < PRICE_CACHE_TTL_SEC:
+        return body, etag
+    return publish_data_payload()
+
+
+@app.route("/api/data", methods=["GET"])
+def api_data():
+    body, etag = current_data_body()
+    response = app.response_class(body, mimetype="application/json")
+    # Weak, so Flask-Compress leaves it alone and it still matches across encodings.
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "max-age=5"
+    return response.make_conditional(request)
 
 
 @app.route("/api/risk-state", methods=["GET"])
@@ -1828,7 +2335,7 @@ def api_risk_state():
             {
                 "date": _risk_state.get("date"),
                 "daily_used_risk": safe_round(_risk_state.get("daily_used_risk", 0.0)),
-                "daily_risk_budget": safe_round(ACCOUNT_SIZE * (DAILY_RISK_CAP_PERCENT / 100.0)),
+                "daily_risk_budget": safe_round(DAILY_RISK_BUDGET),
                 "active_positions": len(_risk_state.get("open_positions", {})),
                 "open_positions": _risk_state.get("open_positions", {}),
                 "limits": {
@@ -1848,7 +2355,7 @@ def api_performance():
         perf["weekly"] = _weekly_snapshot_locked()
         perf["risk_usage"] = {
             "used": safe_round(_risk_state.get("daily_used_risk", 0.0)),
-            "budget": safe_round(ACCOUNT_SIZE * (DAILY_RISK_CAP_PERCENT / 100.0)),
+            "budget": safe_round(DAILY_RISK_BUDGET),
             "open_positions": len(_risk_state.get("open_positions", {})),
         }
         return jsonify(perf)
@@ -1945,109 +2452,131 @@ def api_calibrate():
 
 
 # ================= PANEL =================
+HOME_HTML = """
+<html>
+<head>
+<title>BIST Decision Panel v3</title>
+</head>
+<body>
+<h1>BIST Alarm + Karar Paneli (v3)</h1>
+<p>Preset: {{strategy["preset"]}} | AL: {{strategy["al_threshold"]}} | SAT: {{strategy["sat_threshold"]}}</p>
+
+<table border="1" cellpadding="10">
+<tr>
+    <th>Hisse</th>
+    <th>Fiyat</th>
+    <th>Alt</th>
+    <th>Ust</th>
+    <th>Bant</th>
+    <th>Karar</th>
+    <th>Guven</th>
+</tr>
+{% for s in watchlist %}
+<tr>
+    <td>{{s}}</td>
+    <td id="price-{{s}}">-</td>
+    <td id="lower-{{s}}">{{watchlist[s]["lower"]}}</td>
+    <td id="upper-{{s}}">{{watchlist[s]["upper"]}}</td>
+    <td id="band-{{s}}">-</td>
+    <td id="decision-{{s}}">-</td>
+    <td id="score-{{s}}">-</td>
+</tr>
+{% endfor %}
+</table>
+
+<form method="post">
+<select name="symbol">
+{% for s in watchlist %}
+    <option value="{{s}}">{{s}}</option>
+{% endfor %}
+</select>
+<input name="lower" placeholder="Alt Limit">
+<input name="upper" placeholder="Ust Limit">
+<button type="submit">Guncelle</button>
+</form>
+
+<script>
+async function refresh(){
+    const r = await fetch("/api/data");
+    const d = await r.json();
+    for(const s in d.prices){
+        document.getElementById("price-"+s).innerText =
+            d.prices[s]===null ? "Veri Yok" : d.prices[s];
+        document.getElementById("band-"+s).innerText = d.band_signals[s] || "-";
+
+        const decision = d.decisions && d.decisions[s] ? d.decisions[s] : null;
+        if (decision) {
+            document.getElementById("decision-"+s).innerText = decision.action || "-";
+            document.getElementById("score-"+s).innerText = (decision.score ?? "-") + "/100";
+        } else {
+            document.getElementById("decision-"+s).innerText = "-";
+            document.getElementById("score-"+s).innerText = "-";
+        }
+
+        if (d.watchlist && d.watchlist[s]) {
+            document.getElementById("lower-" + s).innerText = d.watchlist[s].lower;
+            document.getElementById("upper-" + s).innerText = d.watchlist[s].upper;
+        }
+    }
+}
+setInterval(refresh, 15000);
+refresh();
+</script>
+
+</body>
+</html>
+"""
+
+_HOME_TEMPLATE = app.jinja_env.from_string(HOME_HTML)
+_LIMIT_RE = re.compile(r"^-?\d+(?:[.,]\d+)?$")
+
+
+def _parse_limit(raw: Optional[str]) -> Optional[float]:
+    match = _LIMIT_RE.match((raw or "").strip())
+    if not match:
+        return None
+    return float(match.group().replace(",", "."))
+
+
+def home_html() -> str:
+    global _home_html
+    # Only the band limits vary between renders; reuse the page until one changes.
+    with _state_lock:
+        html = _home_html
+        if html is None:
+            bands = {k: {"lower": v["lower"], "upper": v["upper"]} for k, v in WATCHLIST.items()}
+            html = _home_html = _HOME_TEMPLATE.render(watchlist=bands, strategy=EFFECTIVE_STRATEGY)
+    return html
+
+
 @app.route("/", methods=["GET", "POST"])
 def home():
+    status = 200
     if request.method == "POST":
-        symbol = request.form.get("symbol")
-        lower_raw = (request.form.get("lower") or "").strip().replace(",", ".")
-        upper_raw = (request.form.get("upper") or "").strip().replace(",", ".")
-
-        try:
-            lower = float(lower_raw)
-            upper = float(upper_raw)
-        except Exception:
-            lower = None
-            upper = None
+        symbol = request.form.get("symbol", "")
+        lower = _parse_limit(request.form.get("lower")) if symbol in WATCHLIST_SYMBOLS else None
+        upper = _parse_limit(request.form.get("upper")) if lower is not None else None
 
-        if symbol in WATCHLIST and lower is not None and upper is not None:
+        if upper is None:
+            status = 400
+        else:
             with _state_lock:
                 WATCHLIST[symbol]["lower"] = lower
                 WATCHLIST[symbol]["upper"] = upper
                 WATCHLIST[symbol]["alerted"] = None
                 WATCHLIST[symbol]["initialized"] = True
+                mark_bands_dirty_locked()
+            invalidate_data_payload()
+            _monitor_wake.set()
 
-    with _state_lock:
-        snapshot = {k: v.copy() for k, v in WATCHLIST.items()}
-
-    html = """
-    <html>
-    <head>
-    <title>BIST Decision Panel v3</title>
-    </head>
-    <body>
-    <h1>BIST Alarm + Karar Paneli (v3)</h1>
-    <p>Preset: {{strategy["preset"]}} | AL: {{strategy["al_threshold"]}} | SAT: {{strategy["sat_threshold"]}}</p>
-
-    <table border="1" cellpadding="10">
-    <tr>
-        <th>Hisse</th>
-        <th>Fiyat</th>
-        <th>Alt</th>
-        <th>Ust</th>
-        <th>Bant</th>
-        <th>Karar</th>
-        <th>Guven</th>
-    </tr>
-    {% for s in watchlist %}
-    <tr>
-        <td>{{s}}</td>
-        <td id="price-{{s}}">-</td>
-        <td id="lower-{{s}}">{{watchlist[s]["lower"]}}</td>
-        <td id="upper-{{s}}">{{watchlist[s]["upper"]}}</td>
-        <td id="band-{{s}}">-</td>
-        <td id="decision-{{s}}">-</td>
-        <td id="score-{{s}}">-</td>
-    </tr>
-    {% endfor %}
-    </table>
-
-    <form method="post">
-    <select name="symbol">
-    {% for s in watchlist %}
-        <option value="{{s}}">{{s}}</option>
-    {% endfor %}
-    </select>
-    <input name="lower" placeholder="Alt Limit">
-    <input name="upper" placeholder="Ust Limit">
-    <button type="submit">Guncelle</button>
-    </form>
-
-    <script>
-    async function refresh(){
-        const r = await fetch("/api/data");
-        const d = await r.json();
-        for(const s in d.prices){
-            document.getElementById("price-"+s).innerText =
-                d.prices[s]===null ? "Veri Yok" : d.prices[s];
-            document.getElementById("band-"+s).innerText = d.band_signals[s] || "-";
-
-            const decision = d.decisions && d.decisions[s] ? d.decisions[s] : null;
-            if (decision) {
-                document.getElementById("decision-"+s).innerText = decision.action || "-";
-                document.getElementById("score-"+s).innerText = (decision.score ?? "-") + "/100";
-            } else {
-                document.getElementById("decision-"+s).innerText = "-";
-                document.getElementById("score-"+s).innerText = "-";
-            }
-
-            if (d.watchlist && d.watchlist[s]) {
-                document.getElementById("lower-" + s).innerText = d.watchlist[s].lower;
-                document.getElementById("upper-" + s).innerText = d.watchlist[s].upper;
-            }
-        }
-    }
-    setInterval(refresh, 15000);
-    refresh();
-    </script>
-
-    </body>
-    </html>
-    """
-
-    return render_template_string(html, watchlist=snapshot, strategy=EFFECTIVE_STRATEGY)
+    response = app.make_response((home_html(), status))
+    if request.method == "GET":
+        response.headers["Cache-Control"] = "max-age=5"
+    return response
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     if RUN_MONITOR_IN_WEB:
         ensure_monitor_started()
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "8080")))
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "8080")), threaded=True)
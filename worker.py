@@ -1,12 +1,18 @@
-import time
+import logging
 import os
-import requests
-import yfinance as yf
+import time
+from typing import Optional
+
+import orjson
 
-TOKEN = os.environ["TOKEN"]
-CHAT_ID = os.environ["CHAT_ID"]
+from app import TELEGRAM_ENABLED, latest_prices, price_monitor_loop, send_telegram
+
+logger = logging.getLogger("borsa.worker")
 
 CHECK_INTERVAL = int(os.environ.get("CHECK_INTERVAL", "5"))
+RUN_APP_MONITOR = os.environ.get("WORKER_RUN_APP_MONITOR", "false").strip().lower() == "true"
+# Kept apart from app's STATE_FILE: that one holds the monitor's bands, this one the fixed-level flags.
+WORKER_STATE_FILE = os.environ.get("WORKER_STATE_FILE", "").strip()
 
 WATCHLIST = {
     "ASELS.IS": {"below": 654, "above": 700},
@@ -15,45 +21,110 @@ WATCHLIST = {
     "EREGL.IS": {"below": 45, "above": 55},
     "TUPRS.IS": {"below": 130, "above": 150},
 }
+# Levels never change at runtime; unpack them once instead of on every tick.
+LEVELS = [(symbol, levels["below"], levels["above"]) for symbol, levels in WATCHLIST.items()]
 
 state = {s: {"below": False, "above": False} for s in WATCHLIST}
+# Symbols whose last fetch had no price; lets a Yahoo outage log once per symbol, not every tick.
+unpriced = set()
+_saved_state: Optional[bytes] = None
 
-def send_telegram(text: str):
-    url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
-    requests.post(url, json={"chat_id": CHAT_ID, "text": text}, timeout=15)
 
-def last_price(symbol: str) -> float:
-    df = yf.download(symbol, period="1d", interval="1m", progress=False)
-    return float(df["Close"].iloc[-1])
+def load_state():
+    global _saved_state
+    if not WORKER_STATE_FILE:
+        return
+    try:
+        with open(WORKER_STATE_FILE, "rb") as fh:
+            raw = fh.read()
+        saved = orjson.loads(raw)
+    except FileNotFoundError:
+        return
+    except (OSError, orjson.JSONDecodeError) as exc:
+        logger.warning("could not load WORKER_STATE_FILE %s: %s", WORKER_STATE_FILE, exc)
+        return
+    if not isinstance(saved, dict):
+        logger.warning("ignoring WORKER_STATE_FILE %s: expected a JSON object", WORKER_STATE_FILE)
+        return
+    # Merge onto the defaults so symbols added to or dropped from WATCHLIST since the save stay consistent.
+    for symbol, flags in saved.items():
+        if symbol in state and isinstance(flags, dict):
+            state[symbol].update({k: bool(flags[k]) for k in ("below", "above") if k in flags})
+    _saved_state = raw
 
-def check_once():
-    for symbol, levels in WATCHLIST.items():
-        try:
-            price = last_price(symbol)
-            below, above = levels["below"], levels["above"]
 
-            # alt
-            if price <= below and not state[symbol]["below"]:
-                send_telegram(f"🔻 {symbol} {price:.2f} <= ALT {below} (ALIM alarmı)")
-                state[symbol]["below"] = True
-                state[symbol]["above"] = False
+def save_state():
+    global _saved_state
+    if not WORKER_STATE_FILE:
+        return
+    body = orjson.dumps(state)
+    # Most ticks flip no flag; skip the write unless the bytes differ.
+    if body == _saved_state:
+        return
+    tmp_path = f"{WORKER_STATE_FILE}.tmp"
+    try:
+        with open(tmp_path, "wb") as fh:
+            fh.write(body)
+        os.replace(tmp_path, WORKER_STATE_FILE)
+    except OSError as exc:
+        logger.warning("could not save WORKER_STATE_FILE %s: %s", WORKER_STATE_FILE, exc)
+        return
+    _saved_state = body
+
 
-            # üst
-            elif price >= above and not state[symbol]["above"]:
-                send_telegram(f"🔺 {symbol} {price:.2f} >= ÜST {above} (SATIM alarmı)")
-                state[symbol]["above"] = True
-                state[symbol]["below"] = False
+def check_once():
+    # One batched fetch per tick through app's shared quote cache and session.
+    prices = latest_prices(list(WATCHLIST), max_age_sec=CHECK_INTERVAL)
+    for symbol, below, above in LEVELS:
+        price = prices.get(symbol)
+        if price is None:
+            if symbol not in unpriced:
+                logger.warning("no price for %s", symbol)
+                unpriced.add(symbol)
+            continue
+        if symbol in unpriced:
+            logger.info("price for %s is back", symbol)
+            unpriced.discard(symbol)
+        flags = state[symbol]
 
-            # normal aralık → reset (tekrar tetiklenebilsin)
-            elif below < price < above:
-                state[symbol]["below"] = False
-                state[symbol]["above"] = False
+        # alt
+        if price <= below and not flags["below"]:
+            send_telegram(f"🔻 {symbol} {price:.2f} <= ALT {below} (ALIM alarmı)")
+            flags["below"] = True
+            flags["above"] = False
 
-        except Exception as e:
-            print(f"[ERR] {symbol}: {e}")
+        # üst
+        elif price >= above and not flags["above"]:
+            send_telegram(f"🔺 {symbol} {price:.2f} >= ÜST {above} (SATIM alarmı)")
+            flags["above"] = True
+            flags["below"] = False
+
+        # normal aralık → reset (tekrar tetiklenebilsin)
+        elif below < price < above:
+            flags["below"] = False
+            flags["above"] = False
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not TELEGRAM_ENABLED:
+        raise SystemExit("TOKEN and CHAT_ID must be set for the worker to send alerts")
     send_telegram("✅ BIST alarm botu başladı.")
+    if RUN_APP_MONITOR:
+        price_monitor_loop()
+    load_state()
+    # Deadline schedule: ticks start every CHECK_INTERVAL seconds however long the fetch took.
+    next_tick = time.monotonic()
     while True:
-        check_once()
-        time.sleep(CHECK_INTERVAL)
+        try:
+            check_once()
+        except Exception:
+            logger.exception("worker check failed")
+        save_state()
+        next_tick += CHECK_INTERVAL
+        if next_tick <= time.monotonic():
+            skipped = 0
+            while next_tick <= time.monotonic():
+                next_tick += CHECK_INTERVAL
+                skipped += 1
+            logger.warning("worker tick overran; skipping %d missed slot(s)", skipped)
+        time.sleep(max(0.0, next_tick - time.monotonic()))